@@ -1,36 +1,43 @@
-import base64
 import os
-import tempfile
-from flask import Flask, jsonify, render_template_string, request
-from pyembroidery import write_pes, write_svg
+from typing import Tuple
 
-from embroider_class import TurtleEmbroidery
+from flask import Flask, Response, abort, jsonify, render_template_string, request
 
+from embroider_class import OpBuffer, get_thread_turtle, render_pes_bytes, render_svg
+from render_cache import RenderCache, content_key, svg_payload
+from turtle_script import execute, parse_program
 
-def render_svg(pattern) -> str:
-    """Return SVG data for the given pattern as a UTF-8 string."""
-    fd, path = tempfile.mkstemp(suffix=".svg")
-    os.close(fd)
-    try:
-        write_svg(pattern, path)
-        with open(path, "r", encoding="utf-8") as handle:
-            return handle.read()
-    finally:
-        if os.path.exists(path):
-            os.remove(path)
-
-
-def render_pes_bytes(pattern) -> bytes:
-    """Return PES bytes for download."""
-    fd, path = tempfile.mkstemp(suffix=".pes")
-    os.close(fd)
-    try:
-        write_pes(pattern, path)
-        with open(path, "rb") as handle:
-            return handle.read()
-    finally:
-        if os.path.exists(path):
-            os.remove(path)
+
+PES_FILENAME = "turtle_pattern.pes"
+
+
+def _render_script(source: str, color: str, step: float) -> Tuple[str, bytes, int]:
+    """Run a user script and render it to (svg, pes_bytes, point_count)."""
+    # walk the script ourselves instead of exec(): only whitelisted turtle calls can run.
+    # Loops are unrolled straight into one opcode stream (capped at MAX_OPS),
+    # so all stitch expansion happens in a single kernel call.
+    ops = OpBuffer()
+    execute(parse_program(source), ops.add)
+    t = get_thread_turtle(color, step)
+    t.run_ops(*ops.arrays())
+
+    pattern = t.finish()
+    return render_svg(pattern), render_pes_bytes(pattern), t.point_count
+
+
+_renders = RenderCache(maxsize=256)
+
+
+def _render_cached(source: str, color: str, step: float) -> Tuple[str, dict]:
+    """
+    Return (key, entry) for a script, rendering it only on a cache miss.
+
+    Scripts are deterministic, so re-running an unchanged one (the usual
+    tweak-and-click loop) is served from memory. The key addresses the
+    entry for the /svg/<key> endpoint.
+    """
+    key = content_key(source, color, step)
+    return key, _renders.get_or_render(key, lambda: _render_script(source, color, step))
 
 
 app = Flask(__name__)
@@ -220,7 +227,6 @@ TEMPLATE = """
     const errorEl = document.getElementById('error');
     const preview = document.getElementById('preview');
     const downloadBtn = document.getElementById('download');
-    let pesUrl = null;
 
     const indentUnit = '    ';
     const starter = `# Spaces are used for indentation. Press Enter after a ':' to auto-indent.\nfor i in range(24):\n    forward(120)\n    left(150)\n    forward(60)\n    left(10)\n\npenup()\nleft(90)\nforward(40)\npendown()\nfor i in range(36):\n    forward(80)\n    left(170)`;
@@ -251,13 +257,6 @@ TEMPLATE = """
       }
     });
 
-    function revokePesUrl() {
-      if (pesUrl) {
-        URL.revokeObjectURL(pesUrl);
-        pesUrl = null;
-      }
-    }
-
     async function runPattern() {
       runBtn.disabled = true;
       downloadBtn.setAttribute('aria-disabled', 'true');
@@ -265,7 +264,6 @@ TEMPLATE = """
       errorEl.textContent = '';
       preview.textContent = 'Rendering…';
       downloadBtn.hidden = true;
-      revokePesUrl();
       try {
         const code = editor.value.replace(/\t/g, indentUnit);
         const response = await fetch('/run', {
@@ -278,16 +276,12 @@ TEMPLATE = """
           preview.textContent = 'Error';
           errorEl.textContent = data.error;
         } else {
-          preview.innerHTML = data.svg;
+          const svgResponse = await fetch(data.svg_url);
+          if (!svgResponse.ok) throw new Error('Preview expired, run again');
+          preview.innerHTML = await svgResponse.text();
           statusEl.textContent = 'Rendered ' + data.point_count + ' points';
-          if (data.pes_base64) {
-            const binary = atob(data.pes_base64);
-            const len = binary.length;
-            const bytes = new Uint8Array(len);
-            for (let i = 0; i < len; i += 1) bytes[i] = binary.charCodeAt(i);
-            const blob = new Blob([bytes], { type: 'application/octet-stream' });
-            pesUrl = URL.createObjectURL(blob);
-            downloadBtn.href = pesUrl;
+          if (data.pes_url) {
+            downloadBtn.href = data.pes_url;
             downloadBtn.download = data.pes_filename || 'turtle_pattern.pes';
             downloadBtn.hidden = false;
             downloadBtn.removeAttribute('aria-disabled');
@@ -318,40 +312,42 @@ def run_code():
     payload = request.get_json(force=True)
     source = (payload.get("code", "") or "").expandtabs(4)
 
-    t = TurtleEmbroidery(color="#00aa55", step=1.5)
-    env = {
-        "t": t,
-        "forward": t.forward,
-        "back": t.back,
-        "left": t.left,
-        "right": t.right,
-        "penup": t.penup,
-        "pendown": t.pendown,
-        "goto": t.goto,
-        "setheading": t.setheading,
-        "draw_spiro": t.draw_spiro,
-        "draw_square": t.draw_square,
-        "range": range,
-        "math": __import__("math"),
-    }
-
     try:
-        exec(source, {"__builtins__": {}}, env)
+        key, entry = _render_cached(source, "#00aa55", 1.5)
     except Exception as exc:  # noqa: BLE001
         return jsonify({"error": f"{exc.__class__.__name__}: {exc}"})
 
-    pattern = t.finish()
-    svg_content = render_svg(pattern)
-    pes_bytes = render_pes_bytes(pattern)
-    pes_base64 = base64.b64encode(pes_bytes).decode("ascii")
     return jsonify({
-        "svg": svg_content,
-        "pes_base64": pes_base64,
-        "pes_filename": "turtle_pattern.pes",
-        "point_count": len(t.points),
+        "svg_url": f"/svg/{key}",
+        "pes_url": f"/pes/{key}",
+        "pes_filename": PES_FILENAME,
+        "point_count": entry["point_count"],
     })
 
 
+@app.route("/svg/<key>")
+def svg_preview(key):
+    """Serve a rendered SVG preview by its cache key (pre-gzipped if the client accepts it)."""
+    entry = _renders.get(key)
+    if entry is None:
+        abort(404)
+    body, headers = svg_payload(entry, request.headers.get("Accept-Encoding"))
+    return Response(body, mimetype="image/svg+xml", headers=headers)
+
+
+@app.route("/pes/<key>")
+def pes_download(key):
+    """Serve a rendered PES file as a raw download by its cache key."""
+    entry = _renders.get(key)
+    if entry is None:
+        abort(404)
+    return Response(
+        entry["pes_bytes"],
+        mimetype="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{PES_FILENAME}"'},
+    )
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5001"))
     app.run(debug=True, host="0.0.0.0", port=port)
@@ -1,5 +1,24 @@
+import io
 import math
-from pyembroidery import (
+import os
+import tempfile
+import threading
+
+
+def _numba_cache_dir():
+    """Next to this module when writable, else the temp dir (read-only container images)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    if os.access(here, os.W_OK):
+        return os.path.join(here, ".numba_cache")
+    return os.path.join(tempfile.gettempdir(), "turtle_embroidery_numba_cache")
+
+
+# keep numba's compiled kernels on disk so restarts skip LLVM
+os.environ.setdefault("NUMBA_CACHE_DIR", _numba_cache_dir())
+
+import numpy as np  # noqa: E402
+from numba import njit  # noqa: E402
+from pyembroidery import (  # noqa: E402
     EmbPattern,
     EmbThread,
     STITCH,
@@ -10,6 +29,265 @@ from pyembroidery import (
 )
 
 
+# hard cap on recorded points per turtle (~17 MB of buffers); far beyond any
+# real embroidery, but stops e.g. forward(1e9) from trying to allocate gigabytes
+MAX_POINTS = 1_000_000
+# point buffers start at INITIAL_CAPACITY; reset() keeps up to RESET_CAPACITY
+# (~1 MB) for reuse and drops anything bigger, so one huge pattern doesn't pin
+# its buffers on a worker thread forever
+INITIAL_CAPACITY = 1024
+RESET_CAPACITY = 1 << 16
+# largest width/height finish() accepts, in machine units (0.1 mm) -- i.e. 10 m;
+# anything bigger is a runaway jump the writers would split into endless pieces
+MAX_EXTENT = 100_000
+
+# cap on ops in one compiled stream (~17 MB of buffers); script loops are
+# unrolled into the stream, so this is what stops range(10**9) eating memory
+MAX_OPS = 1_000_000
+
+_TOO_MANY_POINTS = f"Pattern needs more than {MAX_POINTS} points; use a larger step or shorter moves"
+TOO_MANY_OPS = f"Script expands to more than {MAX_OPS} turtle commands; use fewer or shorter loops"
+
+
+# ---------- opcode stream (see TurtleEmbroidery.run_ops) ----------
+
+# every op carries two float args; unused ones are 0.0
+OP_FORWARD = 0     # (distance, -)
+OP_LEFT = 1        # (angle, -)
+OP_SETHEADING = 2  # (angle, -)
+OP_PENUP = 3
+OP_PENDOWN = 4
+OP_GOTO = 5        # (x, y)
+
+
+# explicit signature: compiled (or loaded from the disk cache) at import time,
+# so the first request after a restart doesn't pay for JIT compilation
+# no fastmath: it lets LLVM assume finite values, and the limit checks below rely on inf/nan comparing false
+@njit(
+    "int64(int8[::1], float64[:, ::1], float64, int64, float64[::1], float64[::1], float64[::1], uint8[::1])",
+    cache=True,
+)
+def _expand_strokes(ops, args, step, limit, state, xs, ys, pen):
+    """
+    Walk an opcode stream and write every recorded point into xs / ys / pen.
+
+    state is (x, y, heading, pen_down) and is updated in place.
+    Returns the number of points the stream produces; when that is more
+    than len(xs) only the first len(xs) are written, so the caller can
+    retry with bigger buffers and a fresh copy of state.
+    Returns -1 as soon as the stream would produce more than `limit` points
+    (or a move of non-finite length).
+    """
+    x = state[0]
+    y = state[1]
+    heading = state[2]
+    down = state[3] != 0.0
+    cap = xs.shape[0]
+    n = 0
+
+    for i in range(ops.shape[0]):
+        op = ops[i]
+        if op == OP_FORWARD:
+            distance = args[i, 0]
+            if distance == 0.0:
+                continue
+            q = abs(distance) / step
+            if not q < limit:
+                return -1
+            steps = max(1, int(q))
+            step_len = distance / steps
+            ang = math.radians(heading)
+            sdx = math.cos(ang) * step_len
+            sdy = math.sin(ang) * step_len
+            end_x = x + sdx * steps
+            end_y = y + sdy * steps
+        elif op == OP_GOTO:
+            dx = args[i, 0] - x
+            dy = args[i, 1] - y
+            if down:
+                dist = math.hypot(dx, dy)
+                if dist == 0.0:
+                    continue
+                q = dist / step
+                if not q < limit:
+                    return -1
+                steps = max(1, int(q))
+                sdx = dx / steps
+                sdy = dy / steps
+            else:
+                steps = 1
+                sdx = dx
+                sdy = dy
+            # land exactly on the target rather than on the sum of the substeps
+            end_x = args[i, 0]
+            end_y = args[i, 1]
+        else:
+            if op == OP_LEFT:
+                heading += args[i, 0]
+            elif op == OP_SETHEADING:
+                heading = args[i, 0]
+            elif op == OP_PENUP:
+                down = False
+            elif op == OP_PENDOWN:
+                down = True
+            continue
+
+        if n + steps > limit:
+            return -1
+        flag = 1 if down else 0
+        for k in range(1, steps):
+            if n < cap:
+                xs[n] = x + sdx * k
+                ys[n] = y + sdy * k
+                pen[n] = flag
+            n += 1
+        if n < cap:
+            xs[n] = end_x
+            ys[n] = end_y
+            pen[n] = flag
+        n += 1
+        x = end_x
+        y = end_y
+
+    state[0] = x
+    state[1] = y
+    state[2] = heading
+    state[3] = 1.0 if down else 0.0
+    return n
+
+
+def spiro_points(R, r, d, revolutions=6, step_deg=3):
+    """Return (xs, ys) arrays sampling a Spirograph-style hypotrochoid every step_deg degrees."""
+    if not all(math.isfinite(v) for v in (R, r, d, revolutions, step_deg)):
+        raise ValueError("Turtle arguments must be finite numbers")
+    if step_deg <= 0:
+        raise ValueError("draw_spiro step_deg must be positive")
+    if r == 0:
+        raise ValueError("draw_spiro r must be non-zero")
+    # check the sample count before np.arange allocates it
+    if 360 * revolutions / step_deg > MAX_POINTS:
+        raise ValueError(_TOO_MANY_POINTS)
+    angles = np.arange(0, int(360 * revolutions) + 1, step_deg, dtype=np.float64)
+    t = np.deg2rad(angles)
+    k = (R - r) / r
+
+    xs = (R - r) * np.cos(t) + d * np.cos(k * t)
+    ys = (R - r) * np.sin(t) - d * np.sin(k * t)
+    return xs, ys
+
+
+class OpBuffer:
+    """
+    Growing (ops, args) arrays for TurtleEmbroidery.run_ops().
+
+    add() lowers one turtle call: back/right and the draw_square/draw_spiro
+    helpers are rewritten in terms of the primitive ops, so the result is a
+    flat, loop-free stream. Raises ValueError once it would exceed MAX_OPS.
+    """
+
+    def __init__(self, capacity=256):
+        self._n = 0
+        self._ops = np.empty(capacity, dtype=np.int8)
+        self._args = np.zeros((capacity, 2), dtype=np.float64)
+
+    def __len__(self):
+        return self._n
+
+    def _reserve(self, count):
+        """Make room for `count` more ops, growing geometrically up to MAX_OPS."""
+        needed = self._n + count
+        if needed > MAX_OPS:
+            raise ValueError(TOO_MANY_OPS)
+        if needed <= len(self._ops):
+            return
+        cap = min(max(needed, 2 * len(self._ops)), MAX_OPS)
+        ops = np.empty(cap, dtype=np.int8)
+        args = np.zeros((cap, 2), dtype=np.float64)
+        ops[: self._n] = self._ops[: self._n]
+        args[: self._n] = self._args[: self._n]
+        self._ops = ops
+        self._args = args
+
+    def _emit(self, op, a=0.0, b=0.0):
+        self._reserve(1)
+        n = self._n
+        self._ops[n] = op
+        self._args[n, 0] = a
+        self._args[n, 1] = b
+        self._n = n + 1
+
+    def add(self, name, args):
+        """Append the ops for one (name, args) turtle call."""
+        try:
+            args = [float(a) for a in args]
+        except OverflowError:
+            raise ValueError("Turtle arguments must be finite numbers") from None
+        if not all(math.isfinite(a) for a in args):
+            raise ValueError("Turtle arguments must be finite numbers")
+
+        if name == "forward":
+            self._emit(OP_FORWARD, args[0])
+        elif name == "back":
+            self._emit(OP_FORWARD, -args[0])
+        elif name == "left":
+            self._emit(OP_LEFT, args[0])
+        elif name == "right":
+            self._emit(OP_LEFT, -args[0])
+        elif name == "setheading":
+            self._emit(OP_SETHEADING, args[0])
+        elif name == "penup":
+            self._emit(OP_PENUP)
+        elif name == "pendown":
+            self._emit(OP_PENDOWN)
+        elif name == "goto":
+            self._emit(OP_GOTO, args[0], args[1])
+        elif name == "draw_square":
+            for _ in range(4):
+                self._emit(OP_FORWARD, args[0])
+                self._emit(OP_LEFT, 90)
+        elif name == "draw_spiro":
+            self._add_spiro(*args)
+        else:
+            raise ValueError(f"Unsupported command: {name}")
+
+    def _add_spiro(self, R, r, d, revolutions=6, step_deg=3):
+        xs, ys = spiro_points(R, r, d, revolutions, step_deg)
+        count = len(xs)
+        if count == 0:
+            self._emit(OP_PENUP)
+            self._emit(OP_PENUP)
+            return
+
+        # penup, goto first point, pendown, goto the rest, penup
+        self._reserve(count + 3)
+        n = self._n
+        self._ops[n] = OP_PENUP
+        self._ops[n + 1] = OP_GOTO
+        self._ops[n + 2] = OP_PENDOWN
+        self._ops[n + 3 : n + count + 2] = OP_GOTO
+        self._ops[n + count + 2] = OP_PENUP
+        self._args[n : n + count + 3] = 0.0
+        self._args[n + 1] = (xs[0], ys[0])
+        self._args[n + 3 : n + count + 2, 0] = xs[1:]
+        self._args[n + 3 : n + count + 2, 1] = ys[1:]
+        self._n = n + count + 3
+
+    def arrays(self):
+        """Return the (ops, args) arrays recorded so far (views, no copy)."""
+        return self._ops[: self._n], self._args[: self._n]
+
+
+def compile_ops(calls):
+    """
+    Lower (name, args) turtle calls into the (ops, args) arrays run by
+    TurtleEmbroidery.run_ops(); see OpBuffer.
+    """
+    ops = OpBuffer()
+    for name, args in calls:
+        ops.add(name, args)
+    return ops.arrays()
+
+
 class TurtleEmbroidery:
     """
     Turtle-like drawing interface for pyembroidery.
@@ -37,20 +315,99 @@ class TurtleEmbroidery:
         self.heading = 0.0
         self.pen_down = True
 
-        # record of points: list of (x, y, pen_down)
-        self.points = []
+        # cos/sin of the heading they were computed for; recomputed only when it changes
+        self._trig_heading = 0.0
+        self._cos_h = 1.0
+        self._sin_h = 0.0
+
+        # record of points, struct-of-arrays: the first _n slots of _xs/_ys/_pen are live
+        self._n = 0
+        self._allocate(INITIAL_CAPACITY)
+
+    def reset(self, color=None, step=None):
+        """
+        Return to the freshly-constructed state so the instance can be reused.
+
+        The point buffers keep their capacity unless it grew past
+        RESET_CAPACITY; color/step are only changed when given.
+        """
+        if color is not None:
+            self.color = color
+        if step is not None:
+            self.step = float(step)
+
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.pen_down = True
+        self._n = 0
+        if self._cap > RESET_CAPACITY:
+            self._allocate(INITIAL_CAPACITY)
+
+    def _allocate(self, cap):
+        """Replace the point buffers with empty ones of the given capacity."""
+        self._cap = cap
+        self._xs = np.empty(cap)
+        self._ys = np.empty(cap)
+        self._pen = np.empty(cap, dtype=np.uint8)
+
+    @property
+    def point_count(self):
+        """Number of recorded points."""
+        return self._n
+
+    @property
+    def points(self):
+        """Recorded points as a list of (x, y, pen_down) tuples (built on demand)."""
+        n = self._n
+        return list(zip(self._xs[:n].tolist(), self._ys[:n].tolist(), self._pen[:n].astype(bool).tolist()))
 
     # ---------- logical movement (no stitches yet) ----------
 
+    def _reserve(self, count):
+        """Make room for `count` more points, doubling the buffers as needed."""
+        needed = self._n + count
+        if needed <= self._cap:
+            return
+        if needed > MAX_POINTS:
+            raise ValueError(_TOO_MANY_POINTS)
+        cap = self._cap
+        while cap < needed:
+            cap *= 2
+        cap = min(cap, MAX_POINTS)
+        for name in ("_xs", "_ys", "_pen"):
+            old = getattr(self, name)
+            new = np.empty(cap, dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+        self._cap = cap
+
     def _record_point(self):
         """Record current position and pen state."""
-        self.points.append((self.x, self.y, self.pen_down))
-
-    def _step_relative_logic(self, dx, dy):
-        """Update logical position by (dx, dy) and record."""
-        self.x += float(dx)
-        self.y += float(dy)
-        self._record_point()
+        if self._n == self._cap:
+            self._reserve(1)
+        n = self._n
+        self._xs[n] = self.x
+        self._ys[n] = self.y
+        self._pen[n] = self.pen_down
+        self._n = n + 1
+
+    def _step_run_logic(self, sdx, sdy, steps):
+        """Take `steps` equal (sdx, sdy) increments in one go and record each of them."""
+        self._reserve(steps)
+        start = self._n
+        end = start + steps
+        idx = np.arange(1, steps + 1, dtype=np.float64)
+        xs = self._xs[start:end]
+        ys = self._ys[start:end]
+        np.multiply(idx, sdx, out=xs)
+        np.multiply(idx, sdy, out=ys)
+        xs += self.x
+        ys += self.y
+        self._pen[start:end] = self.pen_down
+        self._n = end
+        self.x = float(xs[-1])
+        self.y = float(ys[-1])
 
     def _move_to_logic(self, x, y):
         """Move logically to absolute (x, y) using step-sized increments if pen is down."""
@@ -62,12 +419,73 @@ class TurtleEmbroidery:
             if dist == 0:
                 return
             steps = max(1, int(dist / self.step))
-            sdx = dx / steps
-            sdy = dy / steps
-            for _ in range(steps):
-                self._step_relative_logic(sdx, sdy)
+            self._reserve(steps)
+            start = self._n
+            end = start + steps
+            # linspace puts the last substep exactly on (x, y), so chained gotos don't drift
+            self._xs[start:end] = np.linspace(self.x + dx / steps, x, steps)
+            self._ys[start:end] = np.linspace(self.y + dy / steps, y, steps)
+            self._pen[start:end] = 1
+            self._n = end
+            self.x = x
+            self.y = y
+        else:
+            self.x = x
+            self.y = y
+            self._record_point()
+
+    def _goto_batch(self, xs, ys):
+        """
+        Same as goto() for each (xs[i], ys[i]) in turn, without a Python loop.
+
+        With the pen down every leg is split into step-sized substeps
+        (zero-length legs are skipped, like goto()); with the pen up each
+        target is recorded as a single jump.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if len(xs) == 0:
+            return
+
+        if not self.pen_down:
+            out_x, out_y = xs, ys
         else:
-            self._step_relative_logic(dx, dy)
+            start_x = np.concatenate(([self.x], xs[:-1]))
+            start_y = np.concatenate(([self.y], ys[:-1]))
+            dx = xs - start_x
+            dy = ys - start_y
+            dist = np.hypot(dx, dy)
+            moving = dist != 0
+            if not moving.any():
+                return
+            start_x, start_y = start_x[moving], start_y[moving]
+            dx, dy, dist = dx[moving], dy[moving], dist[moving]
+
+            # check before the int cast (which would overflow) and before np.repeat allocates
+            if (dist / self.step >= MAX_POINTS).any():
+                raise ValueError(_TOO_MANY_POINTS)
+            steps = np.maximum(1, (dist / self.step).astype(np.int64))
+            self._reserve(int(steps.sum()))
+            # for every output point: which leg it belongs to and its 1-based substep index
+            leg = np.repeat(np.arange(len(steps)), steps)
+            k = np.arange(1, steps.sum() + 1) - np.repeat(np.cumsum(steps) - steps, steps)
+            out_x = start_x[leg] + (dx / steps)[leg] * k
+            out_y = start_y[leg] + (dy / steps)[leg] * k
+            # like goto(), each leg ends exactly on its target
+            leg_end = np.cumsum(steps) - 1
+            out_x[leg_end] = xs[moving]
+            out_y[leg_end] = ys[moving]
+
+        count = len(out_x)
+        self._reserve(count)
+        start = self._n
+        end = start + count
+        self._xs[start:end] = out_x
+        self._ys[start:end] = out_y
+        self._pen[start:end] = self.pen_down
+        self._n = end
+        self.x = float(out_x[-1])
+        self.y = float(out_y[-1])
 
     # ---------- turtle-like API ----------
 
@@ -75,15 +493,25 @@ class TurtleEmbroidery:
         """Move forward in the current heading, logically."""
         if distance == 0:
             return
+        if not math.isfinite(distance):
+            raise ValueError("Turtle arguments must be finite numbers")
+
+        if self.heading != self._trig_heading:
+            ang = math.radians(self.heading)
+            self._trig_heading = self.heading
+            self._cos_h = math.cos(ang)
+            self._sin_h = math.sin(ang)
+
+        steps = int(abs(distance) / self.step)
+        if steps <= 1:
+            # short move (the common forward(step) case): one point, no array work
+            self.x += self._cos_h * distance
+            self.y += self._sin_h * distance
+            self._record_point()
+            return
 
-        steps = max(1, int(abs(distance) / self.step))
         step_len = distance / steps
-        ang = math.radians(self.heading)
-        dx = math.cos(ang) * step_len
-        dy = math.sin(ang) * step_len
-
-        for _ in range(steps):
-            self._step_relative_logic(dx, dy)
+        self._step_run_logic(self._cos_h * step_len, self._sin_h * step_len, steps)
 
     def back(self, distance):
         self.forward(-distance)
@@ -102,11 +530,49 @@ class TurtleEmbroidery:
 
     def goto(self, x, y):
         """Logical absolute move; will be turned into relative stitches later."""
-        self._move_to_logic(float(x), float(y))
+        x = float(x)
+        y = float(y)
+        if not (math.isfinite(x) and math.isfinite(y)):
+            raise ValueError("Turtle arguments must be finite numbers")
+        self._move_to_logic(x, y)
 
     def setheading(self, angle):
         self.heading = float(angle)
 
+    def run_ops(self, ops, args):
+        """
+        Execute a whole opcode stream (see compile_ops) in one compiled pass.
+
+        Same result as calling forward()/left()/goto()/... one at a time,
+        but the per-stitch expansion runs inside the numba kernel.
+        """
+        ops = np.ascontiguousarray(ops, dtype=np.int8)
+        args = np.ascontiguousarray(args, dtype=np.float64).reshape(-1, 2)
+        if not np.isfinite(args).all():
+            raise ValueError("Turtle arguments must be finite numbers")
+        start = np.array([self.x, self.y, self.heading, 1.0 if self.pen_down else 0.0])
+
+        # the kernel writes straight into the free tail of the point buffers;
+        # if it needs more room than is left, grow and run again from `start`
+        self._reserve(min(4 * len(ops), MAX_POINTS - self._n))
+        while True:
+            state = start.copy()
+            lo = self._n
+            n = _expand_strokes(
+                ops, args, self.step, MAX_POINTS - lo, state, self._xs[lo:], self._ys[lo:], self._pen[lo:]
+            )
+            if n < 0:
+                raise ValueError(_TOO_MANY_POINTS)
+            if lo + n <= self._cap:
+                break
+            self._reserve(n)
+
+        self._n += n
+        self.x = float(state[0])
+        self.y = float(state[1])
+        self.heading = float(state[2])
+        self.pen_down = bool(state[3])
+
     # (you can add color changes later if needed; for now single colour like square_clean.py)
 
     # ---------- simple shapes ----------
@@ -120,24 +586,14 @@ class TurtleEmbroidery:
         """
         Draw a Spirograph-style hypotrochoid, then later we shift it into +x,+y.
         """
-        self.penup()
-        first = True
-
-        for angle in range(0, int(360 * revolutions) + 1, step_deg):
-            t = math.radians(angle)
-            k = (R - r) / r
-
-            x = (R - r) * math.cos(t) + d * math.cos(k * t)
-            y = (R - r) * math.sin(t) - d * math.sin(k * t)
-
-            if first:
-                self.goto(x, y)
-                self.pendown()
-                first = False
-            else:
-                self.goto(x, y)
+        xs, ys = spiro_points(R, r, d, revolutions, step_deg)
 
         self.penup()
+        if len(xs):
+            self.goto(xs[0], ys[0])
+            self.pendown()
+            self._goto_batch(xs[1:], ys[1:])
+        self.penup()
 
     # ---------- build EmbPattern in square_clean style ----------
 
@@ -148,40 +604,96 @@ class TurtleEmbroidery:
         - starts with JUMP at (0,0),
         - contains only relative stitches/jumps,
         - all coordinates are in the +x,+y quadrant (min_x = 0, min_y = 0),
+        - all coordinates are whole machine units, with no zero-length stitches,
         - ends with END.
         """
         pattern = EmbPattern()
         pattern.add_thread(EmbThread(self.color))
 
-        if not self.points:
+        n = self._n
+        if n == 0:
             pattern.add_command(END)
             return pattern
 
-        # 1) shift points so min_x = 0, min_y = 0
-        xs = [p[0] for p in self.points]
-        ys = [p[1] for p in self.points]
-        min_x = min(xs)
-        min_y = min(ys)
-
-        shifted = [(x - min_x, y - min_y, pen) for (x, y, pen) in self.points]
+        # 1) shift points so min_x = 0, min_y = 0, snapped to whole
+        #    machine units (0.1 mm) since that is all the writers keep anyway
+        xs = self._xs[:n]
+        ys = self._ys[:n]
+        if not (np.isfinite(xs).all() and np.isfinite(ys).all()):
+            raise ValueError("Pattern has non-finite coordinates")
+        if np.ptp(xs) > MAX_EXTENT or np.ptp(ys) > MAX_EXTENT:
+            raise ValueError(f"Pattern is larger than {MAX_EXTENT} units (0.1 mm) across")
+        shifted_x = np.rint(xs - xs.min()).astype(np.int64)
+        shifted_y = np.rint(ys - ys.min()).astype(np.int64)
+        pen = self._pen[:n].astype(np.int8)
+
+        #    drop points that round onto the one before (zero-length stitches),
+        #    but keep them where the pen state changes
+        keep = (
+            (np.diff(shifted_x, prepend=0) != 0)
+            | (np.diff(shifted_y, prepend=0) != 0)
+            | (np.diff(pen, prepend=pen[0]) != 0)
+        )
+        shifted_x = shifted_x[keep]
+        shifted_y = shifted_y[keep]
+        pen = pen[keep]
+        n = len(pen)
 
         # 2) start at (0,0) with a JUMP (like square_clean.py)
         pattern.add_stitch_absolute(JUMP, 0, 0)
-        prev_x, prev_y = 0.0, 0.0
 
-        # 3) replay shifted points as relative moves
-        for (x, y, pen) in shifted:
-            dx = x - prev_x
-            dy = y - prev_y
-            cmd = STITCH if pen else JUMP
-            pattern.add_stitch_relative(cmd, dx, dy)
-            prev_x, prev_y = x, y
+        # 3) append the shifted points in bulk. pyembroidery stores absolute
+        #    positions, which is exactly what replaying the relative moves
+        #    would accumulate to, so skip add_stitch_relative() per point.
+        #    Rows are filled into one (n, 3) int array and converted with a
+        #    single tolist(), which builds the [x, y, cmd] lists in C. Pen
+        #    state changes rarely, so the command column is one value per run.
+        if n:
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(pen)) + 1, [n]))
+            run_cmds = np.where(pen[bounds[:-1]] != 0, STITCH, JUMP)
+            table = np.empty((n, 3), dtype=np.int64)
+            table[:, 0] = shifted_x
+            table[:, 1] = shifted_y
+            table[:, 2] = np.repeat(run_cmds, np.diff(bounds))
+            rows = table.tolist()
+            last_x, last_y, last_cmd = rows.pop()
+            pattern.stitches.extend(rows)
+            # the last one goes through the API so the pattern's "previous position" stays in sync
+            pattern.add_stitch_absolute(last_cmd, last_x, last_y)
 
         # 4) END
         pattern.add_command(END)
         return pattern
 
 
+def render_svg(pattern) -> str:
+    """Return SVG data for the given pattern as a UTF-8 string."""
+    # pyembroidery writes straight to any file-like object, no temp file needed
+    buffer = io.BytesIO()
+    write_svg(pattern, buffer)
+    return buffer.getvalue().decode("utf-8")
+
+
+def render_pes_bytes(pattern) -> bytes:
+    """Return the pattern as PES file bytes."""
+    buffer = io.BytesIO()
+    write_pes(pattern, buffer)
+    return buffer.getvalue()
+
+
+_thread_local = threading.local()
+
+
+def get_thread_turtle(color, step):
+    """Return this thread's TurtleEmbroidery, reset for a new pattern (reuses its buffers)."""
+    turtle = getattr(_thread_local, "turtle", None)
+    if turtle is None:
+        turtle = _thread_local.turtle = TurtleEmbroidery(color=color, step=step)
+    else:
+        turtle.reset(color=color, step=step)
+    return turtle
+
+
 # ---------- demo / quick test ----------
 
 def main():
@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_key(*parts) -> str:
+    """Stable hex key for a render request (script or commands, plus colour and step)."""
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def accepts_gzip(accept_encoding) -> bool:
+    """True if an Accept-Encoding header value allows a gzip-encoded response."""
+    wildcard = False
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding in ("gzip", "x-gzip"):
+            return q > 0
+        if coding == "*":
+            wildcard = q > 0
+    return wildcard
+
+
+def svg_payload(entry, accept_encoding):
+    """
+    Return (body, headers) for serving an entry's SVG preview.
+
+    The stored gzip bytes go out as-is when the client accepts gzip, and are
+    decompressed on the fly otherwise.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+        return entry["svg_gz"], headers
+    return gzip.decompress(entry["svg_gz"]), headers
+
+
+def _entry_size(entry):
+    return len(entry["svg_gz"]) + len(entry["pes_bytes"])
+
+
+class RenderCache:
+    """
+    Small thread-safe LRU of rendered patterns, addressable by content_key().
+
+    Bounded both by entry count (maxsize) and by the total size of the stored
+    SVG/PES bytes (max_bytes); least recently used entries are evicted first.
+
+    Each entry is a dict with:
+    - "svg_gz": the SVG preview, gzip-compressed once so it can be served as-is,
+    - "pes_bytes": the PES file,
+    - "point_count": number of turtle points.
+    """
+
+    def __init__(self, maxsize=256, max_bytes=64 << 20):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry for key, or None if it was never rendered or has been evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_or_render(self, key, render):
+        """Return the entry for key, calling render() -> (svg, pes_bytes, point_count) on a miss."""
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        svg, pes_bytes, point_count = render()
+        entry = {
+            "svg_gz": gzip.compress(svg.encode("utf-8"), compresslevel=6),
+            "pes_bytes": pes_bytes,
+            "point_count": point_count,
+        }
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= _entry_size(previous)
+            self._entries[key] = entry
+            self._bytes += _entry_size(entry)
+            # never evict the entry just stored, even if it alone is over budget
+            while len(self._entries) > 1 and (len(self._entries) > self.maxsize or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _entry_size(evicted)
+        return entry
@@ -1,21 +1,25 @@
-import base64
 import os
 import re
-import tempfile
-from typing import Iterable, List, Literal, Tuple
+from typing import List, Literal, Tuple
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field, validator
-from pyembroidery import write_pes, write_svg
 
-from embroider_class import TurtleEmbroidery
+from embroider_class import MAX_OPS, TOO_MANY_OPS, compile_ops, get_thread_turtle, render_pes_bytes, render_svg
+from render_cache import RenderCache, content_key, svg_payload
+from turtle_script import check_arity
 
 
 # indentation used by the tiny DSL (matches the web editor: 4 spaces)
 INDENT_WIDTH = 4
 
+PES_FILENAME = "turtle_pattern.pes"
+
+# loop header of the tiny DSL: for i in range(N):
+_FOR_RE = re.compile(r"for\s+\w+\s+in\s+range\(\s*([0-9]+)\s*\)\s*:\s*$", re.IGNORECASE)
+
 
 # ---------- Pydantic models ----------
 
@@ -61,95 +65,37 @@ class ExportScriptRequest(BaseModel):
 # ---------- Helpers ----------
 
 
-def _render_svg(pattern) -> str:
-    """Write to temp SVG and return the text."""
-    fd, path = tempfile.mkstemp(suffix=".svg")
-    os.close(fd)
-    try:
-        write_svg(pattern, path)
-        with open(path, "r", encoding="utf-8") as handle:
-            return handle.read()
-    finally:
-        if os.path.exists(path):
-            os.remove(path)
-
-
-def _render_pes_bytes(pattern) -> bytes:
-    """Write to temp PES and return bytes."""
-    fd, path = tempfile.mkstemp(suffix=".pes")
-    os.close(fd)
-    try:
-        write_pes(pattern, path)
-        with open(path, "rb") as handle:
-            return handle.read()
-    finally:
-        if os.path.exists(path):
-            os.remove(path)
-
-
-def _apply_command(turtle: TurtleEmbroidery, command: Command):
-    """Dispatch a validated command to the turtle instance."""
-    op = command.op
-    args = command.args
-
-    # simple arity validation
-    expected: dict[str, Iterable[int] | int] = {
-        "forward": 1,
-        "back": 1,
-        "left": 1,
-        "right": 1,
-        "penup": 0,
-        "pendown": 0,
-        "goto": 2,
-        "setheading": 1,
-        "draw_square": 1,
-        "draw_spiro": (3, 4, 5),
-    }
+def _render_calls(calls: Tuple[Tuple[str, Tuple[float, ...]], ...], step: float, color: str) -> Tuple[str, bytes, int]:
+    """Stitch and render a (op, args) call stream to (svg, pes_bytes, point_count)."""
+    # lower the whole stream to one opcode array so stitches are expanded in a single kernel call
+    ops, args = compile_ops(calls)
+    turtle = get_thread_turtle(color, step)
+    turtle.run_ops(ops, args)
+
+    pattern = turtle.finish()
+    return render_svg(pattern), render_pes_bytes(pattern), turtle.point_count
 
-    allowed_counts = expected[op]
-    if isinstance(allowed_counts, int):
-        allowed_counts = (allowed_counts,)
-    if len(args) not in allowed_counts:
-        raise ValueError(f"{op} expects {allowed_counts} args, got {len(args)}")
-
-    if op == "forward":
-        turtle.forward(args[0])
-    elif op == "back":
-        turtle.back(args[0])
-    elif op == "left":
-        turtle.left(args[0])
-    elif op == "right":
-        turtle.right(args[0])
-    elif op == "penup":
-        turtle.penup()
-    elif op == "pendown":
-        turtle.pendown()
-    elif op == "goto":
-        turtle.goto(args[0], args[1])
-    elif op == "setheading":
-        turtle.setheading(args[0])
-    elif op == "draw_square":
-        turtle.draw_square(args[0])
-    elif op == "draw_spiro":
-        turtle.draw_spiro(*args)
-    else:  # pragma: no cover - exhaustive
-        raise ValueError(f"Unsupported command: {op}")
+
+_renders = RenderCache(maxsize=256)
+
+
+def _render_cached(calls: Tuple[Tuple[str, Tuple[float, ...]], ...], step: float, color: str) -> Tuple[str, dict]:
+    """Return (key, entry) for a call stream; identical requests are served from memory."""
+    key = content_key(calls, step, color)
+    return key, _renders.get_or_render(key, lambda: _render_calls(calls, step, color))
 
 
 def build_pattern(commands: List[Command], *, step: float, color: str):
     """Run command list through TurtleEmbroidery and produce outputs."""
-    turtle = TurtleEmbroidery(color=color, step=step)
     for command in commands:
-        _apply_command(turtle, command)
+        check_arity(command.op, command.args)
 
-    pattern = turtle.finish()
-    svg_content = _render_svg(pattern)
-    pes_bytes = _render_pes_bytes(pattern)
+    calls = tuple((command.op, tuple(command.args)) for command in commands)
+    key, entry = _render_cached(calls, step, color)
     return {
-        "pattern": pattern,
-        "svg": svg_content,
-        "pes_bytes": pes_bytes,
-        "point_count": len(turtle.points),
+        "svg_url": f"/svg/{key}",
+        "pes_url": f"/pes/{key}",
+        "point_count": entry["point_count"],
     }
 
 
@@ -165,7 +111,8 @@ def _parse_line_to_command(line: str) -> Command:
     op_part, rest = stripped.split("(", 1)
     op = op_part.strip().lower()
     arg_str = rest[:-1]  # drop trailing ')'
-    arg_tokens = [tok for tok in re.split(r"[,\s]+", arg_str.strip()) if tok]
+    # args are separated by commas and/or whitespace
+    arg_tokens = arg_str.replace(",", " ").split()
 
     numeric_args = []
     for arg in arg_tokens:
@@ -200,12 +147,15 @@ def _parse_script_block(lines: List[str], start: int, indent: int) -> Tuple[List
 
         stripped = raw.strip()
         lowered = stripped.lower()
-        for_match = re.match(r"for\s+\w+\s+in\s+range\(\s*([0-9]+)\s*\)\s*:\s*$", stripped, re.IGNORECASE)
+        # cheap prefix test first; only loop headers pay for the regex
+        for_match = _FOR_RE.match(stripped) if lowered.startswith("for") else None
         if for_match:
             count = int(for_match.group(1))
             block_start = i + 1
             block_indent = indent + INDENT_WIDTH
             block_commands, consumed = _parse_script_block(lines, block_start, block_indent)
+            if len(commands) + count * len(block_commands) > MAX_OPS:
+                raise ValueError(TOO_MANY_OPS)
             for _ in range(count):
                 commands.extend(block_commands)
             i = consumed
@@ -238,11 +188,10 @@ def export_pattern(payload: ExportRequest):
         result = build_pattern(payload.commands, step=payload.step, color=payload.color)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    pes_base64 = base64.b64encode(result["pes_bytes"]).decode("ascii")
     return JSONResponse({
-        "svg": result["svg"],
-        "pes_base64": pes_base64,
-        "pes_filename": "turtle_pattern.pes",
+        "svg_url": result["svg_url"],
+        "pes_url": result["pes_url"],
+        "pes_filename": PES_FILENAME,
         "point_count": result["point_count"],
     })
 
@@ -254,16 +203,38 @@ def export_script(payload: ExportScriptRequest):
         result = build_pattern(commands, step=payload.step, color=payload.color)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    pes_base64 = base64.b64encode(result["pes_bytes"]).decode("ascii")
     return JSONResponse({
-        "svg": result["svg"],
-        "pes_base64": pes_base64,
-        "pes_filename": "turtle_pattern.pes",
+        "svg_url": result["svg_url"],
+        "pes_url": result["pes_url"],
+        "pes_filename": PES_FILENAME,
         "point_count": result["point_count"],
         "commands": [c.dict() for c in commands],
     })
 
 
+@app.get("/svg/{key}")
+def svg_preview(key: str, request: Request):
+    """Serve a rendered SVG preview by its cache key (pre-gzipped if the client accepts it)."""
+    entry = _renders.get(key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired preview")
+    body, headers = svg_payload(entry, request.headers.get("accept-encoding"))
+    return Response(body, media_type="image/svg+xml", headers=headers)
+
+
+@app.get("/pes/{key}")
+def pes_download(key: str):
+    """Serve a rendered PES file as a raw download by its cache key."""
+    entry = _renders.get(key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired pattern")
+    return Response(
+        entry["pes_bytes"],
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{PES_FILENAME}"'},
+    )
+
+
 # serve /static and /images when present
 if os.path.isdir("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
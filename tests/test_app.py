@@ -0,0 +1,71 @@
+import gzip
+
+import pytest
+
+import app
+from render_cache import RenderCache
+
+SCRIPT = "for i in range(4):\n    forward(20)\n    left(90)\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "_renders", RenderCache(maxsize=2))
+    return app.app.test_client()
+
+
+def run(client, code=SCRIPT):
+    response = client.post("/run", json={"code": code})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_run_returns_urls_not_payloads(client):
+    data = run(client)
+    assert set(data) == {"svg_url", "pes_url", "pes_filename", "point_count"}
+    assert data["pes_filename"] == app.PES_FILENAME
+    assert data["point_count"] > 0
+    assert data["svg_url"].startswith("/svg/") and data["pes_url"].startswith("/pes/")
+
+
+def test_svg_round_trip(client):
+    data = run(client)
+
+    response = client.get(data["svg_url"], headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/svg+xml"
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.data).startswith(b"<svg")
+
+    response = client.get(data["svg_url"])
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.data.startswith(b"<svg")
+
+
+def test_pes_round_trip(client):
+    data = run(client)
+    response = client.get(data["pes_url"])
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+    assert response.headers["Content-Disposition"] == f'attachment; filename="{app.PES_FILENAME}"'
+    assert response.data.startswith(b"#PES")
+
+
+def test_same_script_same_urls(client):
+    assert run(client) == run(client)
+
+
+def test_evicted_entries_are_404(client):
+    first = run(client)
+    run(client, "forward(10)")
+    run(client, "forward(20)")
+    assert client.get(first["svg_url"]).status_code == 404
+    assert client.get(first["pes_url"]).status_code == 404
+    assert client.get("/svg/unknown").status_code == 404
+
+
+def test_script_errors_come_back_as_json(client):
+    assert run(client, "import os") == {"error": "SyntaxError: Import is not supported here (line 1)"}
+    assert run(client, "forward(1e400)")["error"].startswith("ValueError")
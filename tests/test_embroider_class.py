@@ -0,0 +1,222 @@
+import threading
+
+import numpy as np
+import pytest
+from pyembroidery import END, JUMP, STITCH
+
+from embroider_class import INITIAL_CAPACITY, MAX_POINTS, RESET_CAPACITY, TurtleEmbroidery, compile_ops, get_thread_turtle
+
+
+def test_reset_keeps_small_buffers_and_drops_oversized_ones():
+    t = TurtleEmbroidery(step=1.0)
+    t.forward(2000)
+    grown = t._cap
+    t.reset()
+    assert t._cap == grown and t.point_count == 0
+
+    t.forward(2 * RESET_CAPACITY)
+    assert t._cap > RESET_CAPACITY
+    t.reset(step=2.0)
+    assert t._cap == INITIAL_CAPACITY and t.point_count == 0
+
+    t.forward(10)
+    assert np.allclose(t.points[-1], (10.0, 0.0, 1.0))
+
+
+def test_get_thread_turtle_reuses_one_turtle_per_thread():
+    first = get_thread_turtle("#112233", 1.0)
+    first.forward(5)
+    again = get_thread_turtle("#445566", 3.0)
+    assert again is first
+    assert (again.color, again.step, again.point_count) == ("#445566", 3.0, 0)
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_thread_turtle("#112233", 1.0)))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+# ---------- finish() ----------
+
+
+def assert_clean_stitches(stitches):
+    assert all(type(v) is int for row in stitches for v in row)
+    assert all(a != b for a, b in zip(stitches, stitches[1:]))
+
+
+def test_finish_exact_stitches():
+    t = TurtleEmbroidery(step=1.5)
+    t.forward(3)
+    t.penup()
+    t.goto(3, 0)
+    t.pendown()
+    t.forward(2)
+    # 1.5 -> 2 (rint), the jump back onto (3, 0) keeps its pen change,
+    # and the pattern is shifted so its min corner is (0, 0)
+    assert t.finish().stitches == [[0, 0, JUMP], [2, 0, STITCH], [2, 0, JUMP], [4, 0, STITCH], [0, 0, END]]
+
+
+def test_finish_drops_first_point_on_leading_jump():
+    t = TurtleEmbroidery(step=1.5)
+    t.penup()
+    t.goto(0, 0)
+    t.pendown()
+    t.forward(3)
+    assert t.finish().stitches == [[0, 0, JUMP], [2, 0, STITCH], [3, 0, STITCH], [0, 0, END]]
+
+
+def test_finish_drops_stitches_that_snap_together():
+    t = TurtleEmbroidery(step=1.5)
+    for _ in range(3):
+        t.forward(0.2)
+    assert t.finish().stitches == [[0, 0, JUMP], [0, 0, END]]
+
+
+def test_finish_empty_pattern():
+    assert TurtleEmbroidery().finish().stitches == [[0, 0, END]]
+
+
+def test_finish_stitches_are_whole_and_deduplicated():
+    t = TurtleEmbroidery(step=0.7)
+    t.draw_spiro(40, 15, 10, 2, 5)
+    t.pendown()
+    t.draw_square(12.25)
+    t.penup()
+    t.goto(-3.4, 8.6)
+    t.pendown()
+    t.forward(0.3)
+    stitches = t.finish().stitches
+    assert len(stitches) > 100
+    assert stitches[0] == [0, 0, JUMP] and stitches[-1] == [0, 0, END]
+    assert_clean_stitches(stitches)
+    assert min(x for x, _, _ in stitches) == 0 and min(y for _, y, _ in stitches) == 0
+
+
+def test_finish_rejects_runaway_extent():
+    t = TurtleEmbroidery()
+    t.forward(1)
+    t.penup()
+    t.goto(1e300, 0)
+    with pytest.raises(ValueError):
+        t.finish()
+
+
+# ---------- kernel (run_ops) vs per-call methods vs _goto_batch ----------
+
+CALLS = [
+    ("forward", [10.3]),
+    ("left", [30]),
+    ("forward", [7]),
+    ("right", [125]),
+    ("back", [4.5]),
+    ("penup", []),
+    ("goto", [-20, 15]),
+    ("pendown", []),
+    ("goto", [-20, 15]),
+    ("goto", [3.3, -8.1]),
+    ("setheading", [200]),
+    ("forward", [0.5]),
+    ("forward", [0]),
+    ("draw_square", [12]),
+    ("draw_spiro", [40, 15, 10, 1, 7]),
+    ("pendown", []),
+    ("forward", [9]),
+]
+
+
+def state(t):
+    return (t.x, t.y, t.heading, t.pen_down)
+
+
+def assert_same_points(a, b):
+    assert a.point_count == b.point_count
+    n = a.point_count
+    np.testing.assert_allclose(a._xs[:n], b._xs[:n], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(a._ys[:n], b._ys[:n], rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(a._pen[:n], b._pen[:n])
+    np.testing.assert_allclose(state(a)[:3], state(b)[:3], rtol=0, atol=1e-9)
+    assert a.pen_down == b.pen_down
+
+
+def test_run_ops_matches_method_calls():
+    by_method = TurtleEmbroidery(step=1.5)
+    for name, args in CALLS:
+        getattr(by_method, name)(*args)
+
+    by_kernel = TurtleEmbroidery(step=1.5)
+    by_kernel.run_ops(*compile_ops(CALLS))
+
+    assert by_method.point_count > 100
+    assert_same_points(by_kernel, by_method)
+
+
+def test_run_ops_continues_from_current_state():
+    by_method = TurtleEmbroidery(step=1.0)
+    by_kernel = TurtleEmbroidery(step=1.0)
+    for t in (by_method, by_kernel):
+        t.forward(5)
+        t.left(45)
+
+    for name, args in CALLS[:6]:
+        getattr(by_method, name)(*args)
+    by_kernel.run_ops(*compile_ops(CALLS[:6]))
+    assert_same_points(by_kernel, by_method)
+
+
+@pytest.mark.parametrize("pen_down", [True, False])
+def test_goto_batch_matches_goto(pen_down):
+    xs = [3.0, 3.0, -7.25, 12.0, 12.0, 0.1]
+    ys = [4.0, 4.0, 9.5, -2.0, -2.0, 0.2]
+
+    one_by_one = TurtleEmbroidery(step=2.0)
+    batched = TurtleEmbroidery(step=2.0)
+    for t in (one_by_one, batched):
+        t.forward(1)
+        if not pen_down:
+            t.penup()
+
+    for x, y in zip(xs, ys):
+        one_by_one.goto(x, y)
+    batched._goto_batch(xs, ys)
+    assert_same_points(batched, one_by_one)
+
+
+# ---------- input limits ----------
+
+
+@pytest.mark.parametrize(
+    "calls",
+    [[("forward", [float("inf")])], [("goto", [0, float("nan")])], [("draw_spiro", [1, 2, 3, float("inf")])]],
+)
+def test_non_finite_args_are_rejected(calls):
+    with pytest.raises(ValueError):
+        TurtleEmbroidery().run_ops(*compile_ops(calls))
+    with pytest.raises(ValueError):
+        getattr(TurtleEmbroidery(), calls[0][0])(*calls[0][1])
+
+
+def test_bad_spiro_sampling_is_value_error():
+    with pytest.raises(ValueError):
+        TurtleEmbroidery().draw_spiro(40, 15, 10, 6, 0)
+    with pytest.raises(ValueError):
+        TurtleEmbroidery().draw_spiro(40, 0, 10)
+    with pytest.raises(ValueError):
+        compile_ops([("draw_spiro", [40, 15, 10, 1e12])])
+
+
+def test_too_many_points_is_value_error():
+    with pytest.raises(ValueError):
+        TurtleEmbroidery(step=1.0).forward(1e9)
+    with pytest.raises(ValueError):
+        TurtleEmbroidery(step=1.0).run_ops(*compile_ops([("forward", [1e9])]))
+    t = TurtleEmbroidery(step=1.0)
+    with pytest.raises(ValueError):
+        t.goto(1e9, 0)
+    assert t.point_count <= MAX_POINTS
+    with pytest.raises(ValueError):
+        TurtleEmbroidery(step=1.0)._goto_batch([1e20], [0])
+    with pytest.raises(ValueError):
+        TurtleEmbroidery(step=1.0)._goto_batch([6e5, 0], [0, 0])
+    with pytest.raises(ValueError):
+        TurtleEmbroidery().draw_spiro(1e9, 1, 1, 1, 3)
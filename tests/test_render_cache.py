@@ -0,0 +1,60 @@
+import gzip
+
+import pytest
+
+from render_cache import RenderCache, accepts_gzip, svg_payload
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ("", False),
+        ("identity", False),
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("gzip;q=0", False),
+        ("*", True),
+        ("*;q=0", False),
+        ("gzip;q=0, *", False),
+    ],
+)
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+def test_svg_payload_decompresses_for_clients_without_gzip():
+    entry = RenderCache().get_or_render("k", lambda: ("<svg/>", b"pes", 1))
+
+    body, headers = svg_payload(entry, "gzip, deflate")
+    assert gzip.decompress(body) == b"<svg/>"
+    assert headers == {"Vary": "Accept-Encoding", "Content-Encoding": "gzip"}
+
+    body, headers = svg_payload(entry, None)
+    assert body == b"<svg/>"
+    assert headers == {"Vary": "Accept-Encoding"}
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = RenderCache(maxsize=2)
+    for key in "abc":
+        cache.get_or_render(key, lambda: ("<svg/>", b"pes", 1))
+        if key == "b":
+            cache.get("a")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_evicts_least_recently_used_by_bytes():
+    pes = bytes(400)
+    cache = RenderCache(maxsize=100, max_bytes=1000)
+    for key in "abc":
+        cache.get_or_render(key, lambda: ("<svg/>", pes, 1))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache._bytes <= cache.max_bytes
+
+    # an entry bigger than the whole budget is still served, and pushes out the rest
+    entry = cache.get_or_render("huge", lambda: ("<svg/>", bytes(5000), 1))
+    assert cache.get("huge") is entry
+    assert cache.get("b") is None and cache.get("c") is None
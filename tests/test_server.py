@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from render_cache import RenderCache
+
+SCRIPT = "for i in range(4):\n    forward(20)\n    left(90)\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "_renders", RenderCache(maxsize=2))
+    return TestClient(server.app)
+
+
+def export_script(client, script=SCRIPT):
+    response = client.post("/export_script", json={"script": script})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_export_script_returns_urls_not_payloads(client):
+    data = export_script(client)
+    assert set(data) == {"svg_url", "pes_url", "pes_filename", "point_count", "commands"}
+    assert len(data["commands"]) == 8
+    assert data["point_count"] > 0
+
+
+def test_export_returns_urls_not_payloads(client):
+    response = client.post("/export", json={"commands": [{"op": "forward", "args": [30]}, {"op": "left", "args": [90]}]})
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"svg_url", "pes_url", "pes_filename", "point_count"}
+    assert client.get(data["svg_url"]).status_code == 200
+
+
+def test_svg_round_trip(client):
+    data = export_script(client)
+
+    # TestClient decodes gzip transparently, so check the headers for the encoding
+    response = client.get(data["svg_url"], headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text.startswith("<svg")
+
+    response = client.get(data["svg_url"], headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text.startswith("<svg")
+
+
+def test_pes_round_trip(client):
+    data = export_script(client)
+    response = client.get(data["pes_url"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-disposition"] == f'attachment; filename="{server.PES_FILENAME}"'
+    assert response.content.startswith(b"#PES")
+
+
+def test_evicted_entries_are_404(client):
+    first = export_script(client)
+    export_script(client, "forward(10)")
+    export_script(client, "forward(20)")
+    assert client.get(first["svg_url"]).status_code == 404
+    assert client.get(first["pes_url"]).status_code == 404
+    assert client.get("/pes/unknown").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "commands",
+    [
+        [{"op": "goto", "args": [1]}],
+        [{"op": "draw_spiro", "args": [40, 0, 10]}],
+        [{"op": "forward", "args": [1e9]}],
+    ],
+)
+def test_bad_commands_are_400(client, commands):
+    assert client.post("/export", json={"commands": commands}).status_code == 400
+
+
+def test_runaway_script_is_400(client):
+    response = client.post("/export_script", json={"script": "for i in range(10000000):\n    forward(1)"})
+    assert response.status_code == 400
@@ -0,0 +1,164 @@
+import pytest
+
+from turtle_script import execute, parse_program
+
+
+def run(source):
+    calls = []
+    execute(parse_program(source), lambda op, args: calls.append((op, list(args))))
+    return calls
+
+
+# ---------- what scripts may do ----------
+
+
+def test_turtle_calls_bare_and_on_t():
+    assert run("forward(10)\nt.left(90)\npenup()") == [("forward", [10]), ("left", [90]), ("penup", [])]
+
+
+def test_loops_and_assignments():
+    source = "size = 5\nfor i in range(3):\n    size += 1\n    forward(size * 2)\n"
+    assert run(source) == [("forward", [12]), ("forward", [14]), ("forward", [16])]
+
+
+def test_nested_loops_see_loop_variables():
+    source = "for i in range(2):\n    for j in range(i, 3):\n        goto(i, j)\n"
+    assert run(source) == [("goto", [0, 0]), ("goto", [0, 1]), ("goto", [0, 2]), ("goto", [1, 1]), ("goto", [1, 2])]
+
+
+def test_math_names_and_functions():
+    calls = run("forward(math.sqrt(16) + math.pi - math.pi)\nleft(-math.floor(2.5))")
+    assert calls == [("forward", [4.0]), ("left", [-2])]
+
+
+def test_draw_spiro_accepts_optional_args():
+    assert run("draw_spiro(50, 20, 10)\ndraw_spiro(50, 20, 10, 2, 5)")[1] == ("draw_spiro", [50, 20, 10, 2, 5])
+
+
+def test_undefined_name_is_name_error():
+    with pytest.raises(NameError):
+        run("forward(size)")
+
+
+# ---------- what the sandbox rejects ----------
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "import os",
+        "from os import system",
+        "def f():\n    pass",
+        "class C:\n    pass",
+        "while True:\n    forward(1)",
+        "if 1:\n    forward(1)",
+        "with x:\n    pass",
+        "f = lambda: 1",
+        "forward('10')",
+        "forward(b'1')",
+        "forward(True)",
+        "forward([1][0])",
+        "forward(x if 1 else 2)",
+        "forward(1 < 2)",
+        "forward(1 << 2)",
+        "forward(~1)",
+        "x = y = [1]",
+        "a, b = 1, 2",
+        "x.y = 1",
+        "x[0] = 1",
+        "for i in [1, 2]:\n    forward(i)",
+        "for i in range(3, step=1):\n    forward(i)",
+        "for i in range():\n    forward(i)",
+        "for i in range(3):\n    forward(i)\nelse:\n    pass",
+        "for (i, j) in range(3):\n    pass",
+        "10",
+        "forward(distance=10)",
+        "print(1)",
+        "len([])",
+        "forward(abs(-1))",
+        "forward(open('x'))",
+    ],
+)
+def test_rejects_unsupported_syntax(source):
+    with pytest.raises((SyntaxError, NameError)):
+        run(source)
+
+
+def test_rejection_happens_before_any_call():
+    # the whole script is checked up front, even a loop body that never runs
+    calls = []
+    with pytest.raises(SyntaxError):
+        execute(parse_program("forward(1)\nfor i in range(0):\n    import os"), lambda op, args: calls.append(op))
+    assert calls == []
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "t.__class__()",
+        "t.__dict__",
+        "forward(math.__loader__)",
+        "forward(math.__dict__)",
+        "forward(math._x)",
+        "forward(math.pi.__class__)",
+        "forward(os.getpid())",
+        "forward(t.x)",
+        "forward(().__class__)",
+        "forward(__import__('os'))",
+        "forward(math.sqrt.__self__)",
+    ],
+)
+def test_rejects_dunder_and_foreign_attribute_access(source):
+    with pytest.raises((SyntaxError, NameError)):
+        run(source)
+
+
+def test_only_existing_math_names():
+    with pytest.raises(AttributeError):
+        run("forward(math.no_such_thing)")
+
+
+def test_math_constants_are_not_callable():
+    with pytest.raises(SyntaxError):
+        run("forward(math.pi(1))")
+
+
+def test_unknown_turtle_op_is_name_error():
+    with pytest.raises(NameError):
+        run("t.reset()")
+
+
+@pytest.mark.parametrize(
+    "source",
+    ["forward()", "forward(1, 2)", "penup(1)", "goto(1)", "draw_square(1, 2)", "draw_spiro(1, 2)", "draw_spiro(1, 2, 3, 4, 5, 6)"],
+)
+def test_arity_errors(source):
+    with pytest.raises(ValueError, match="expects"):
+        run(source)
+
+
+# ---------- work limits ----------
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "for i in range(10 ** 12):\n    x = i",
+        "for i in range(2 ** 100):\n    pass",
+        "for i in range(1000):\n    for j in range(1000):\n        x = j\n        y = j",
+        "x = 2 ** 10 ** 10",
+        "x = 3 ** 100000",
+        "x = 2 ** 4000\nx = x * x",
+        "x = 2 ** 4000\nfor i in range(200):\n    x += x",
+        "forward(math.factorial(10 ** 7))",
+    ],
+)
+def test_runaway_work_is_rejected(source):
+    with pytest.raises((ValueError, TypeError)):
+        run(source)
+
+
+def test_work_limit_leaves_room_for_real_scripts():
+    calls = run("x = 2 ** 64\nfor i in range(300):\n    for j in range(3):\n        forward(1)\nforward(x % 7)")
+    assert len(calls) == 901
+    assert run("forward(2 ** 0.5 * (-1) ** 2)") == [("forward", [2 ** 0.5])]
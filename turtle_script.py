@@ -0,0 +1,275 @@
+import ast
+import math
+import operator
+
+
+# turtle calls a script may make, with the number of positional args each accepts
+OP_ARITY = {
+    "forward": 1,
+    "back": 1,
+    "left": 1,
+    "right": 1,
+    "penup": 0,
+    "pendown": 0,
+    "goto": 2,
+    "setheading": 1,
+    "draw_square": 1,
+    "draw_spiro": (3, 4, 5),
+}
+
+
+# a script may run at most this many statements (loop bodies count once per
+# iteration), the same order as embroider_class.MAX_OPS for the turtle calls
+MAX_STEPS = 1_000_000
+# integers a script computes may be at most this many bits; Python ints are
+# unbounded, so 2 ** 10 ** 10 would otherwise tie up the worker computing it
+MAX_INT_BITS = 4096
+
+TOO_MANY_STEPS = f"Script runs more than {MAX_STEPS} statements; use fewer or shorter loops"
+_INT_TOO_BIG = f"Integer result is larger than {MAX_INT_BITS} bits"
+
+
+def _mul(a, b):
+    if type(a) is int and type(b) is int and a.bit_length() + b.bit_length() > MAX_INT_BITS:
+        raise ValueError(_INT_TOO_BIG)
+    return a * b
+
+
+def _pow(base, exponent):
+    # checked before computing: the result of an integer power can be astronomically large
+    if type(base) is int and type(exponent) is int and exponent > 0 and (base.bit_length() - 1) * exponent > MAX_INT_BITS:
+        raise ValueError(_INT_TOO_BIG)
+    return base ** exponent
+
+
+def _bounded(value):
+    if type(value) is int and value.bit_length() > MAX_INT_BITS:
+        raise ValueError(_INT_TOO_BIG)
+    return value
+
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _pow,
+}
+
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def check_arity(op, args):
+    """Raise ValueError if `op` is not a turtle call or gets the wrong number of args."""
+    if op not in OP_ARITY:
+        raise ValueError(f"Unsupported command: {op}")
+    allowed_counts = OP_ARITY[op]
+    if isinstance(allowed_counts, int):
+        allowed_counts = (allowed_counts,)
+    if len(args) not in allowed_counts:
+        raise ValueError(f"{op} expects {allowed_counts} args, got {len(args)}")
+
+
+def parse_program(source):
+    """Parse a playground script into an AST for execute()."""
+    return ast.parse(source, filename="<user>", mode="exec")
+
+
+def execute(tree, call):
+    """
+    Run a parsed script, calling call(op, args) for every turtle call.
+
+    Supported: assignments and augmented assignments to plain names,
+    `for <name> in range(...):` loops, turtle calls (bare or as t.<op>(...))
+    and numeric expressions over literals, variables and math.<name>.
+
+    The whole tree is checked and lowered to closures up front, so a loop
+    body is dispatched once, not once per iteration. Raises ValueError once
+    the script would run more than MAX_STEPS statements or compute an
+    integer wider than MAX_INT_BITS.
+    """
+    body = _compile_block(tree.body)
+    run = _Run(call)
+    for statement in body:
+        statement(run)
+
+
+class _Run:
+    """State of one execute() call, shared by the compiled statements."""
+
+    __slots__ = ("variables", "call", "steps_left")
+
+    def __init__(self, call):
+        self.variables = {}
+        self.call = call
+        self.steps_left = MAX_STEPS
+
+
+def _reject(node, what):
+    raise SyntaxError(f"{what} is not supported here (line {getattr(node, 'lineno', '?')})")
+
+
+# ---------- statements: each compiles to fn(run) ----------
+
+
+def _compile_block(body):
+    return [_compile_statement(node) for node in body if not isinstance(node, ast.Pass)]
+
+
+def _compile_statement(node):
+    if isinstance(node, ast.Expr):
+        return _compile_turtle_call(node.value)
+
+    if isinstance(node, ast.Assign):
+        names = [_target_name(target) for target in node.targets]
+        value = _compile_expr(node.value)
+
+        def assign(run):
+            result = value(run.variables)
+            for name in names:
+                run.variables[name] = result
+
+        return assign
+
+    if isinstance(node, ast.AugAssign):
+        name = _target_name(node.target)
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            _reject(node, type(node.op).__name__)
+        value = _compile_expr(node.value)
+
+        def aug_assign(run):
+            variables = run.variables
+            variables[name] = _bounded(op(_load(variables, name), value(variables)))
+
+        return aug_assign
+
+    if isinstance(node, ast.For):
+        if node.orelse:
+            _reject(node, "for/else")
+        name = _target_name(node.target)
+        bounds = _compile_range(node.iter)
+        body = _compile_block(node.body)
+
+        def loop(run):
+            variables = run.variables
+            values = range(*[bound(variables) for bound in bounds])
+            # charge the whole loop up front, so range(10 ** 12) fails before it starts
+            try:
+                run.steps_left -= len(values) * max(1, len(body))
+            except OverflowError:
+                raise ValueError(TOO_MANY_STEPS) from None
+            if run.steps_left < 0:
+                raise ValueError(TOO_MANY_STEPS)
+            for value in values:
+                variables[name] = value
+                for statement in body:
+                    statement(run)
+
+        return loop
+
+    _reject(node, type(node).__name__)
+
+
+def _target_name(node):
+    if not isinstance(node, ast.Name):
+        _reject(node, "assigning to anything but a plain name")
+    return node.id
+
+
+def _compile_range(node):
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range"):
+        _reject(node, "looping over anything but range(...)")
+    if node.keywords or not 1 <= len(node.args) <= 3:
+        _reject(node, "this form of range()")
+    return [_compile_expr(arg) for arg in node.args]
+
+
+def _compile_turtle_call(node):
+    if not isinstance(node, ast.Call):
+        _reject(node, "a bare expression")
+    func = node.func
+    if isinstance(func, ast.Name):
+        op = func.id
+    elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == "t":
+        op = func.attr
+    else:
+        _reject(node, "this kind of call")
+    if op not in OP_ARITY:
+        raise NameError(f"name '{op}' is not defined")
+    if node.keywords:
+        _reject(node, "keyword arguments")
+    check_arity(op, node.args)
+
+    args = [_compile_expr(arg) for arg in node.args]
+    if all(isinstance(arg, ast.Constant) for arg in node.args):
+        constant_args = tuple(arg.value for arg in node.args)
+
+        def turtle_call(run):
+            run.call(op, constant_args)
+
+    else:
+
+        def turtle_call(run):
+            run.call(op, [arg(run.variables) for arg in args])
+
+    return turtle_call
+
+
+# ---------- expressions: each compiles to fn(variables) -> value ----------
+
+
+def _load(variables, name):
+    try:
+        return variables[name]
+    except KeyError:
+        raise NameError(f"name '{name}' is not defined") from None
+
+
+def _compile_expr(node):
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            _reject(node, f"the literal {node.value!r}")
+        value = node.value
+        return lambda variables: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda variables: _load(variables, name)
+    if isinstance(node, ast.BinOp):
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            _reject(node, type(node.op).__name__)
+        left = _compile_expr(node.left)
+        right = _compile_expr(node.right)
+        return lambda variables: _bounded(op(left(variables), right(variables)))
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            _reject(node, type(node.op).__name__)
+        operand = _compile_expr(node.operand)
+        return lambda variables: op(operand(variables))
+    if isinstance(node, ast.Attribute):
+        value = _math_attr(node)
+        return lambda variables: value
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and not node.keywords:
+        func = _math_attr(node.func)
+        if not callable(func):
+            _reject(node, f"calling math.{node.func.attr}")
+        args = [_compile_expr(arg) for arg in node.args]
+        # math functions get floats: integer ones like factorial() can't run away on big ints
+        return lambda variables: _bounded(func(*[float(arg(variables)) for arg in args]))
+    _reject(node, type(node).__name__)
+
+
+def _math_attr(node):
+    if not (isinstance(node.value, ast.Name) and node.value.id == "math") or node.attr.startswith("_"):
+        _reject(node, "attribute access other than math.<name>")
+    try:
+        return getattr(math, node.attr)
+    except AttributeError:
+        raise AttributeError(f"module 'math' has no attribute '{node.attr}'") from None